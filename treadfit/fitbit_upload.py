@@ -1,13 +1,23 @@
 import datetime
 import os
-import glob
-import math
+import itertools
+import json
 import yaml
+from math import pi, sin, tan
 from fitbit import Fitbit
 from dotenv import load_dotenv
 
+# Prefer the LibYAML-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 load_dotenv()
 
+# Same factor math.radians uses, applied inline to save a call per conversion
+_DEG2RAD = pi / 180.0
+
 
 def calculate_calories(
     weight_kg: float, speed_kph: float, incline_deg: float, duration_seconds: float
@@ -23,12 +33,13 @@ def calculate_calories(
     if duration_seconds <= 0:
         return 0.0
 
-    # Speed in meters/min
-    speed_m_min = (speed_kph * 1000) / 60.0
+    # Speed in meters/min (the parenthesised factor is folded at compile time)
+    speed_m_min = speed_kph * (1000 / 60.0)
 
     # Percent grade (fraction)
     # Assuming incline_deg is actual degrees, grade = tan(radians(degrees))
-    grade_fraction = math.tan(math.radians(incline_deg))
+    # Flat running is the common case, so skip the trig for it
+    grade_fraction = tan(incline_deg * _DEG2RAD) if incline_deg else 0.0
 
     # Determine standard MET equation: Walking vs Running
     # Cutoff is typically ~6 km/h (3.7 mph) or if the user is explicitly running.
@@ -44,36 +55,70 @@ def calculate_calories(
 
     # Convert VO2 (ml/kg/min) to Kcal/min
     # Kcal/min = (VO2 * weight_kg) / 1000 * 5
-    kcal_per_min = (vo2_ml_kg_min * weight_kg) / 1000.0 * 5.0
+    kcal_per_min = (vo2_ml_kg_min * weight_kg) * (5.0 / 1000.0)
 
     # Reduce by 20% as manual correction
     return kcal_per_min * (duration_seconds / 60.0) * 0.8
 
 
+def dump_data_point(data_point: dict) -> str:
+    """
+    Serialize one sample as a line of a .jsonl run file (read by load_data_points).
+    """
+    return json.dumps(data_point, separators=(",", ":")) + "\n"
+
+
+def load_data_points(file_path: str) -> list:
+    """
+    Load the samples saved by the TUI from a run file.
+
+    Runs are saved as JSON lines (.jsonl); older runs were appended as
+    YAML lists (.yaml) and are still accepted.
+    """
+    with open(file_path, "r") as f:
+        if file_path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+
+        # Load all documents from the file (in case of multiple appends)
+        all_docs = list(yaml.load_all(f, Loader=YamlLoader))
+
+    # Flatten the list if it's a list of lists or just lists
+    data_points = []
+    for doc in all_docs:
+        if isinstance(doc, list):
+            data_points.extend(doc)
+        elif isinstance(doc, dict):
+            data_points.append(doc)
+    return data_points
+
+
+def list_run_files(data_dir: str = "data") -> list:
+    """
+    List the run files saved by the TUI in data_dir as os.DirEntry objects.
+    """
+    try:
+        with os.scandir(data_dir) as entries:
+            return [
+                entry
+                for entry in entries
+                if entry.name.startswith("treadmill_data_")
+                and entry.name.endswith((".jsonl", ".yaml"))
+            ]
+    except FileNotFoundError:
+        return []
+
+
 def process_existing_runs():
     print("Checking for existing treadmill data to upload...")
-    files = glob.glob("data/treadmill_data_*.yaml")
+    files = list_run_files()
 
-    # Get Fitbit credentials
-    client_id = os.getenv("FITBIT_CLIENT_ID")
-    client_secret = os.getenv("FITBIT_CLIENT_SECRET")
-    access_token = os.getenv("FITBIT_ACCESS_TOKEN")
-    refresh_token = os.getenv("FITBIT_REFRESH_TOKEN")
-
-    if not all([client_id, client_secret, access_token, refresh_token]):
+    # Initialize Fitbit client once; it (and its OAuth session) is reused for
+    # the weight lookup and every upload below.
+    auth2_client = get_fitbit_client()
+    if not auth2_client:
         print("Skipping upload: Credentials not found in .env")
         return
 
-    # Initialize Fitbit client
-    # We ask for METRIC system to ensure weight is in kg
-    auth2_client = Fitbit(
-        client_id,
-        client_secret,
-        access_token=access_token,
-        refresh_token=refresh_token,
-        system="METRIC",
-    )
-
     # Fetch user weight
     user_weight_kg = 86.0
     try:
@@ -89,28 +134,30 @@ def process_existing_runs():
             f"Could not fetch weight from Fitbit (error: {e}), using default: {user_weight_kg} kg"
         )
 
-    for file_path in files:
+    for entry in files:
+        file_path = entry.path
         print(f"Processing {file_path}...")
         try:
-            with open(file_path, "r") as f:
-                # Load all documents from the file (in case of multiple appends)
-                all_docs = list(yaml.safe_load_all(f))
-
-            # Flatten the list if it's a list of lists or just lists
-            data_points = []
-            for doc in all_docs:
-                if isinstance(doc, list):
-                    data_points.extend(doc)
-                elif isinstance(doc, dict):
-                    data_points.append(doc)
+            # Empty files have nothing to parse
+            if entry.stat().st_size == 0:
+                print(f"No data in {file_path}, deleting.")
+                os.remove(file_path)
+                continue
+
+            data_points = load_data_points(file_path)
 
             if not data_points:
                 print(f"No data in {file_path}, deleting.")
                 os.remove(file_path)
                 continue
 
-            # Sort by timestamp
-            data_points.sort(key=lambda x: x["timestamp"])
+            # Samples are appended in time order, so only sort if one is out of place
+            prev_ts = data_points[0]["timestamp"]
+            for point in data_points:
+                if point["timestamp"] < prev_ts:
+                    data_points.sort(key=lambda x: x["timestamp"])
+                    break
+                prev_ts = point["timestamp"]
 
             first_point = data_points[0]
             last_point = data_points[-1]
@@ -129,23 +176,17 @@ def process_existing_runs():
                 # Can't calculate much, assume 0
                 pass
             else:
-                prev_dist = first_point["distance_km"]
-                prev_secs = first_point["seconds_total"]
-
-                for i in range(1, len(data_points)):
-                    curr = data_points[i]
-                    c_dist = curr["distance_km"]
-                    c_secs = curr["seconds_total"]
+                # Walk consecutive (prev, curr) pairs instead of indexing back into the list
+                for prev, curr in itertools.pairwise(data_points):
+                    dist_delta = curr["distance_km"] - prev["distance_km"]
+                    sec_delta = curr["seconds_total"] - prev["seconds_total"]
                     # Use prev incline for the segment
-                    p_incline = data_points[i - 1]["incline_deg"]
+                    p_incline = prev["incline_deg"]
                     # Use prev speed (or average?) for the segment.
                     # Usually better to use the speed setting that was active during the interval.
                     # This file structure records instantaneous values.
                     # We'll use the previous point's speed as the speed for the following interval.
-                    p_speed = data_points[i - 1].get("speed_kph", 0.0)
-
-                    dist_delta = c_dist - prev_dist
-                    sec_delta = c_secs - prev_secs
+                    p_speed = prev.get("speed_kph", 0.0)
 
                     if dist_delta < -0.1 or sec_delta < -5:
                         # Reset detected
@@ -153,10 +194,11 @@ def process_existing_runs():
                     else:
                         if dist_delta > 0:
                             total_distance_km += dist_delta
-                            # Elevation
-                            total_elevation_gain_m += (dist_delta * 1000) * math.sin(
-                                math.radians(p_incline)
-                            )
+                            # Elevation (none gained on a flat segment)
+                            if p_incline:
+                                total_elevation_gain_m += (dist_delta * 1000) * sin(
+                                    p_incline * _DEG2RAD
+                                )
 
                         if sec_delta > 0:
                             total_duration_sec += sec_delta
@@ -182,9 +224,6 @@ def process_existing_runs():
                             )
                             total_calories += seg_cals
 
-                    prev_dist = c_dist
-                    prev_secs = c_secs
-
             if total_duration_sec <= 0:
                 # Fallback to timestamp duration
                 total_duration_sec = last_point["timestamp"] - first_point["timestamp"]
@@ -211,10 +250,6 @@ def process_existing_runs():
             print(f"Estimated Calories: {calories}")
 
             upload_to_fitbit(
-                client_id,
-                client_secret,
-                access_token,
-                refresh_token,
                 distance_km=total_distance_km,
                 avg_speed_kmh=avg_speed_kmh,
                 elevation_m=total_elevation_gain_m,
@@ -236,10 +271,6 @@ def process_existing_runs():
 
 
 def upload_to_fitbit(
-    client_id: str,
-    client_secret: str,
-    access_token: str,
-    refresh_token: str,
     distance_km: float,
     avg_speed_kmh: float,
     elevation_m: float,
@@ -254,19 +285,14 @@ def upload_to_fitbit(
     Note:
     - Speed is derived from distance and duration by Fitbit.
     - Elevation is not supported by the simple log_activity endpoint.
+    - Without fitbit_client, a client is built from the .env credentials.
     """
     if start_dt is None:
         start_dt = datetime.datetime.now()
 
-    if fitbit_client:
-        auth2_client = fitbit_client
-    else:
-        auth2_client = Fitbit(
-            client_id,
-            client_secret,
-            access_token=access_token,
-            refresh_token=refresh_token,
-        )
+    auth2_client = fitbit_client or get_fitbit_client()
+    if not auth2_client:
+        raise ValueError("Fitbit credentials not found in .env")
 
     # duration in milliseconds
     duration_millis = int(duration_seconds * 1000)
@@ -302,6 +328,7 @@ def get_fitbit_client():
     if not all([client_id, client_secret, access_token, refresh_token]):
         return None
 
+    # We ask for METRIC system to ensure weight is in kg
     return Fitbit(
         client_id,
         client_secret,
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from treadfit import fitbit_upload
+from treadfit.fitbit_upload import dump_data_point, list_run_files, load_data_points
+
+
+class TestLoadDataPoints(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+        self.samples = [
+            {
+                "timestamp": 1700000000.0,
+                "speed_kph": 5.0,
+                "incline_deg": 0.0,
+                "distance_km": 0.0,
+                "seconds_total": 0.0,
+            },
+            {
+                "timestamp": 1700000030.0,
+                "speed_kph": 5.5,
+                "incline_deg": 2.5,
+                "distance_km": 0.042,
+                "seconds_total": 30.0,
+            },
+        ]
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_jsonl_round_trip(self):
+        # Written the same way save_loop appends samples
+        path = os.path.join(self.tmp_dir.name, "treadmill_data_2023-11-14.jsonl")
+        with open(path, "a", buffering=1) as f:
+            for sample in self.samples:
+                f.write(dump_data_point(sample))
+
+        self.assertEqual(load_data_points(path), self.samples)
+
+    def test_jsonl_skips_blank_lines(self):
+        content = "".join(dump_data_point(sample) for sample in self.samples)
+        path = self.write_file("treadmill_data_2023-11-14.jsonl", content + "\n")
+
+        self.assertEqual(load_data_points(path), self.samples)
+
+    def test_legacy_yaml_documents(self):
+        # Old versions appended `yaml.dump([data], f)`; files may also hold
+        # several explicit documents, each a list or a single sample.
+        content = (
+            "- distance_km: 0.0\n"
+            "  incline_deg: 0.0\n"
+            "  seconds_total: 0.0\n"
+            "  speed_kph: 5.0\n"
+            "  timestamp: 1700000000.0\n"
+            "---\n"
+            "distance_km: 0.042\n"
+            "incline_deg: 2.5\n"
+            "seconds_total: 30.0\n"
+            "speed_kph: 5.5\n"
+            "timestamp: 1700000030.0\n"
+        )
+        path = self.write_file("treadmill_data_2023-11-14.yaml", content)
+
+        self.assertEqual(load_data_points(path), self.samples)
+
+
+class TestRunFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.data_dir = os.path.join(self.tmp_dir.name, "data")
+        os.mkdir(self.data_dir)
+
+    def touch(self, name, content=""):
+        path = os.path.join(self.data_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_list_run_files_filters_names(self):
+        self.touch("treadmill_data_2023-11-14.jsonl")
+        self.touch("treadmill_data_2023-11-13.yaml")
+        self.touch("treadmill_data_2023-11-12.txt")
+        self.touch("other_2023-11-14.jsonl")
+        os.mkdir(os.path.join(self.data_dir, "nested"))
+
+        names = sorted(entry.name for entry in list_run_files(self.data_dir))
+        self.assertEqual(
+            names,
+            ["treadmill_data_2023-11-13.yaml", "treadmill_data_2023-11-14.jsonl"],
+        )
+
+    def test_list_run_files_missing_dir(self):
+        missing = os.path.join(self.tmp_dir.name, "missing")
+        self.assertEqual(list_run_files(missing), [])
+
+    def test_empty_files_deleted_without_parsing(self):
+        empty = self.touch("treadmill_data_2023-11-14.jsonl")
+        non_empty = self.touch("treadmill_data_2023-11-13.jsonl", "\n")
+        unrelated = self.touch("notes.txt")
+
+        client = mock.Mock()
+        client.user_profile_get.return_value = {"user": {"weight": 80.0}}
+
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        self.addCleanup(os.chdir, cwd)
+        with (
+            mock.patch.object(fitbit_upload, "get_fitbit_client", return_value=client),
+            mock.patch.object(
+                fitbit_upload, "load_data_points", return_value=[]
+            ) as load,
+            mock.patch.object(fitbit_upload, "upload_to_fitbit") as upload,
+            mock.patch("builtins.print"),
+        ):
+            fitbit_upload.process_existing_runs()
+
+        # Only the non-empty run file is parsed; both are removed as having no data
+        load.assert_called_once_with(os.path.join("data", os.path.basename(non_empty)))
+        upload.assert_not_called()
+        self.assertFalse(os.path.exists(empty))
+        self.assertFalse(os.path.exists(non_empty))
+        self.assertTrue(os.path.exists(unrelated))
+
+
+if __name__ == "__main__":
+    unittest.main()
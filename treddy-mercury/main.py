@@ -1,7 +1,6 @@
 import asyncio
+import os
 import struct
-import collections
-import yaml
 import time
 from textual.app import App, ComposeResult
 from textual.containers import Grid, Vertical
@@ -10,7 +9,11 @@ from textual.reactive import reactive
 from textual import work
 from bleak import BleakScanner, BleakClient
 
-from treadfit.fitbit_upload import calculate_calories, get_user_weight
+from treadfit.fitbit_upload import (
+    calculate_calories,
+    dump_data_point,
+    get_user_weight,
+)
 
 # Bluetooth Configuration.
 DEVICE_NAME = "I_TL"
@@ -36,6 +39,14 @@ POLL_SEQUENCE = [
     "ff02182700000000000000000000000000000000",
 ]
 
+# Decoded once at import so the poll loop doesn't re-parse hex every second.
+INIT_FRAMES = tuple(bytes.fromhex(h) for h in INITIALIZATION_SEQUENCE)
+POLL_FRAMES = tuple(bytes.fromhex(h) for h in POLL_SEQUENCE)
+
+# 3. Notification layouts.
+# 0x00 frames carry speed @10, incline @12 and distance @16 (little-endian u16).
+FRAME_00 = struct.Struct("<10xHH2xH")
+
 
 class MetricDigits(Digits):
     pass
@@ -51,9 +62,6 @@ class Metric(Static):
             yield Label(self.label_text, classes="metric-label")
             yield MetricDigits("0.0", id=f"{self.id}-digits")
 
-    def update_value(self, value):
-        self.query_one(f"#{self.id}-digits", Digits).update(f"{value}")
-
 
 class TreadmillApp(App):
     CSS = """
@@ -107,12 +115,14 @@ class TreadmillApp(App):
 
     def __init__(self):
         super().__init__()
-        self.parsed_events = collections.deque()
         self.ble_client = None
+        self.pending_metrics_00 = None
+        self.save_file = None
+        self.save_date = None
         self.stop_event = asyncio.Event()
         self.user_weight_kg = 86.0  # Default, will fetch
         self.accumulated_calories = 0.0
-        self.last_metric_update_time = time.time()
+        self.last_metric_update_time = time.monotonic()
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -127,10 +137,17 @@ class TreadmillApp(App):
         yield Footer()
 
     async def on_mount(self):
+        # Look widgets up once; watchers and status updates reuse them
+        self.metric_digits = {
+            metric.id: metric.query_one(MetricDigits) for metric in self.query(Metric)
+        }
+        self.status_bar = self.query_one("#status-bar", Label)
         # Fetch weight in background
         self.fetch_weight_worker()
         # Start BLE worker
         self.run_worker(self.ble_worker, exclusive=True)
+        # Apply notification bursts to the UI at most 10 times a second
+        self.set_interval(1 / 10, self.flush_metrics)
 
     @work(thread=True)
     def fetch_weight_worker(self):
@@ -142,6 +159,7 @@ class TreadmillApp(App):
 
     def update_weight(self, weight):
         self.user_weight_kg = weight
+        self.update_calorie_rate()
         self.notify(f"User weight loaded: {weight} kg")
 
     async def ble_worker(self):
@@ -171,27 +189,55 @@ class TreadmillApp(App):
 
                     await client.start_notify(NOTIFY_UUID, self.parse_treadmill_data)
 
-                    # Init sequence
-                    for h in INITIALIZATION_SEQUENCE:
-                        await client.write_gatt_char(
-                            WRITE_UUID, bytes.fromhex(h), response=True
-                        )
+                    # Resolve the write characteristic once instead of per write.
+                    write_char = client.services.get_characteristic(WRITE_UUID)
+                    # Only skip the GATT ack on polls if the device allows it.
+                    poll_response = (
+                        "write-without-response" not in write_char.properties
+                    )
+
+                    # Init sequence. The GATT ack only means the BLE stack accepted the
+                    # frame, so keep a gap for the firmware to process each one.
+                    for frame in INIT_FRAMES:
+                        await client.write_gatt_char(write_char, frame, response=True)
                         await asyncio.sleep(0.1)
 
                     # Start save loop as a concurrent task inside the connection block
                     save_task = asyncio.create_task(self.save_loop())
 
+                    # Poll on a fixed schedule so write latency doesn't add drift:
+                    # every 1 s, backing off towards 3 s while the belt is stopped.
+                    loop = asyncio.get_running_loop()
+                    deadline = loop.time()
+                    idle_polls = 0
+
                     try:
                         while client.is_connected and not self.stop_event.is_set():
-                            for hex_cmd in POLL_SEQUENCE:
+                            deadline += min(1.0 + 0.5 * idle_polls, 3.0)
+                            # The poll frames form one fe/00/ff message, so they are
+                            # written in order, without waiting for a GATT ack on
+                            # each one where the characteristic supports that.
+                            for frame in POLL_FRAMES:
                                 await client.write_gatt_char(
-                                    WRITE_UUID, bytes.fromhex(hex_cmd), response=True
+                                    write_char, frame, response=poll_response
                                 )
-                            await asyncio.sleep(1.0)
+
+                            delay = deadline - loop.time()
+                            if delay > 0:
+                                await asyncio.sleep(delay)
+                            else:
+                                # Fell behind; restart the schedule rather than burst
+                                deadline = loop.time()
 
                             # Update derived metrics periodically
                             self.calculate_realtime_metrics()
 
+                            # Same stopped threshold as the calorie/time accounting
+                            if self.speed_kph <= 0.1:
+                                idle_polls += 1
+                            else:
+                                idle_polls = 0
+
                     finally:
                         save_task.cancel()
 
@@ -201,7 +247,7 @@ class TreadmillApp(App):
                 await asyncio.sleep(5)
 
     def update_status(self, status):
-        self.query_one("#status-bar", Label).update(f"Status: {status}")
+        self.status_bar.update(f"Status: {status}")
 
     def parse_treadmill_data(self, _sender: int, data: bytearray):
         if len(data) < 12:
@@ -210,14 +256,16 @@ class TreadmillApp(App):
         match data[0]:
             case 0x00:
                 # Notification message.
-                s = struct.unpack_from("<H", data, 10)[0] / 100.0
-                i = struct.unpack_from("<H", data, 12)[0] / 100.0
-                d = (
-                    struct.unpack_from("<H", data, 16)[0] / 1000.0
-                )  # BLE returns meters? Original code divided by 1000.
+                if len(data) < FRAME_00.size:
+                    return
+                speed, incline, distance = FRAME_00.unpack_from(data)
+                s = speed / 100.0
+                i = incline / 100.0
+                # BLE returns meters? Original code divided by 1000.
+                d = distance / 1000.0
 
-                # Update reactive variables
-                self.update_metrics_00(s, i, d)
+                # Keep only the latest values; flush_metrics updates the UI.
+                self.pending_metrics_00 = (s, i, d)
 
             case 0x01:
                 # Notification message - Time received from treadmill.
@@ -225,37 +273,52 @@ class TreadmillApp(App):
                 # For now, let's just log it but NOT update the main time counter to avoid "countdown" issues.
                 pass
 
+    def flush_metrics(self):
+        if self.pending_metrics_00 is None:
+            return
+        self.update_metrics_00(*self.pending_metrics_00)
+        self.pending_metrics_00 = None
+
     def update_metrics_00(self, s, i, d):
-        self.speed_kph = s
-        self.incline_deg = i
-        self.distance_km = d
+        # One repaint for all three metrics (and the calorie rate they drive)
+        with self.batch_update():
+            self.speed_kph = s
+            self.incline_deg = i
+            self.distance_km = d
 
     # def update_metrics_01(self, sec):
     #    self.seconds_total = sec
 
     def calculate_realtime_metrics(self):
         # Calculate instantaneous calories and time
-        now = time.time()
+        now = time.monotonic()
         dt = now - self.last_metric_update_time
         self.last_metric_update_time = now
 
         if dt <= 0:
             return
 
-        # Calculate rate (cal/hour)
-        cal_per_hour = calculate_calories(
-            self.user_weight_kg, self.speed_kph, self.incline_deg, 3600
-        )
-        self.calories_per_hour = cal_per_hour
-
-        # Accumulate total roughly
+        # Accumulate total roughly, at the rate kept by update_calorie_rate
         # Only accumulate if speed > 0
         if self.speed_kph > 0.1:
-            self.accumulated_calories += (cal_per_hour / 3600) * dt
+            self.accumulated_calories += (self.calories_per_hour / 3600) * dt
             self.calories_burned = self.accumulated_calories
             self.seconds_total += dt
 
+    def update_calorie_rate(self):
+        # The rate only depends on weight, speed and incline, so it is
+        # recomputed when one of them changes rather than on every poll.
+        if self.speed_kph <= 0.1:
+            # Stopped: nothing accumulates, so skip the equation and show 0
+            self.calories_per_hour = 0.0
+            return
+        self.calories_per_hour = calculate_calories(
+            self.user_weight_kg, self.speed_kph, self.incline_deg, 3600
+        )
+
     async def save_loop(self):
+        # One JSON object per line, appended to a file that stays open across
+        # reconnects until the day rolls over or the app exits.
         while True:
             await asyncio.sleep(30)
             data = {
@@ -267,38 +330,62 @@ class TreadmillApp(App):
             }
             try:
                 date_str = time.strftime("%Y-%m-%d", time.localtime(data["timestamp"]))
-                with open(f"data/treadmill_data_{date_str}.yaml", "a") as f:
-                    yaml.dump([data], f)
+                # Reopen on a new day, or if the file was deleted while open
+                # (e.g. upload.sh uploaded and removed it mid-session).
+                if (
+                    date_str != self.save_date
+                    or os.fstat(self.save_file.fileno()).st_nlink == 0
+                ):
+                    self.close_save_file()
+                    self.save_file = open(
+                        f"data/treadmill_data_{date_str}.jsonl", "a", buffering=1
+                    )
+                    self.save_date = date_str
+                self.save_file.write(dump_data_point(data))
                 self.notify("Data saved")
             except Exception as e:
                 self.notify(f"Save failed: {e}", severity="error")
 
+    def close_save_file(self):
+        if self.save_file:
+            self.save_file.close()
+        self.save_file = None
+        self.save_date = None
+
+    def on_unmount(self):
+        self.close_save_file()
+
+    def update_metric(self, metric_id, text):
+        digits = self.metric_digits[metric_id]
+        # Skip the repaint when the displayed (rounded) value is unchanged
+        if digits.value != text:
+            digits.update(text)
+
     # Watchers to update UI
     def watch_speed_kph(self, value):
-        self.query_one("#speed", Metric).update_value(f"{value:.1f}")
+        self.update_metric("speed", f"{value:.1f}")
+        self.update_calorie_rate()
 
     def watch_incline_deg(self, value):
-        self.query_one("#incline", Metric).update_value(f"{value:.1f}")
+        self.update_metric("incline", f"{value:.1f}")
+        self.update_calorie_rate()
 
     def watch_distance_km(self, value):
-        self.query_one("#distance", Metric).update_value(f"{value:.3f}")
+        self.update_metric("distance", f"{value:.3f}")
 
     def watch_seconds_total(self, value):
-        minutes = int((value // 60) % 60)
-        seconds = int(value % 60)
-        hours = int(value // 3600)
+        hours, remainder = divmod(int(value), 3600)
+        minutes, seconds = divmod(remainder, 60)
         if hours > 0:
-            self.query_one("#time", Metric).update_value(
-                f"{hours}:{minutes:02d}:{seconds:02d}"
-            )
+            self.update_metric("time", f"{hours}:{minutes:02d}:{seconds:02d}")
         else:
-            self.query_one("#time", Metric).update_value(f"{minutes}:{seconds:02d}")
+            self.update_metric("time", f"{minutes}:{seconds:02d}")
 
     def watch_calories_burned(self, value):
-        self.query_one("#calories", Metric).update_value(f"{int(value)}")
+        self.update_metric("calories", f"{int(value)}")
 
     def watch_calories_per_hour(self, value):
-        self.query_one("#cal_rate", Metric).update_value(f"{int(value)}")
+        self.update_metric("cal_rate", f"{int(value)}")
 
 
 if __name__ == "__main__":